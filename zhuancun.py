@@ -1,16 +1,60 @@
 import sys
 
-import requests
-import time
+import asyncio
+import httpx
+import orjson
 import logging
+import random
+import time
 from typing import List, Dict, Optional
-from requests.exceptions import RequestException
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 批量接口中每个子请求共用的请求头，多个子请求引用同一个 dict
+BATCH_JSON_HEADERS = {"Content-Type": "application/json"}
+
+class TokenBucket:
+    """令牌桶限流：每秒补充 rate 个令牌，最多积攒 capacity 个，只有令牌耗尽时才需要等待"""
+
+    def __init__(self, rate: float = 8, capacity: int = 16, cooldown: float = 1.0):
+        self.rate = rate
+        self.max_rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        # 并发请求可能同时收到一串429，冷却时间内只降速一次
+        self.cooldown = cooldown
+        self.last_slowdown = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """取走一个令牌，令牌不足时只等待补足所需的最短时间"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def slow_down(self):
+        """遇到429时补充速率减半，距上次降速不足 cooldown 秒时不再重复降速"""
+        now = time.monotonic()
+        if now - self.last_slowdown < self.cooldown:
+            return
+        self.last_slowdown = now
+        self.rate = max(0.5, self.rate / 2)
+
+    def speed_up(self):
+        """请求成功后逐步恢复补充速率"""
+        self.rate = min(self.max_rate, self.rate + 0.1)
+
 class AliPCS:
-    def __init__(self, access_token: str, share_token: str, drive_id: str):
+    def __init__(self, access_token: str, share_token: str, drive_id: str, max_concurrency: int = 8,
+                 rate: float = 8):
         self.base_url = "https://api.aliyundrive.com"
         self.access_token = access_token
         self.drive_id = drive_id
@@ -21,40 +65,103 @@ class AliPCS:
             "X-Canary": "client=web,app=adrive,version=v6.4.2",
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36"
         }
-        self.request_interval = 1  # 初始请求间隔为1秒
-
-    def make_request(self, method, url, headers=None, json=None, max_retries=2):
-        if headers is None:
-            headers = self.headers
-
-        for attempt in range(max_retries):
-            try:
-                response = requests.request(method, url, headers=headers, json=json)
-                response.raise_for_status()
-                self.request_interval = max(1, self.request_interval - 0.1)  # 成功后稍微减少间隔
-                return response.json()
-            except RequestException as e:
-                if response.status_code == 429:
-                    logger.warning(f"请求频率过高，等待后重试。尝试次数：{attempt + 1}")
-                    self.request_interval *= 2  # 遇到429错误时增加等待时间
-                    time.sleep(self.request_interval)
-                else:
+        # 访问分享内容时额外携带的请求头，只构造一次
+        self.share_headers = {"X-Share-Token": self.share_token}
+        self._share_cache: Dict[str, Dict] = {}
+        # 按令牌桶控制请求速率，额度充足时不做任何等待
+        self._bucket = TokenBucket(rate=rate, capacity=16)
+        # 文件批量复制的批大小，被限流时减半，连续成功后逐步放大
+        self.batch_size = 500
+        self.min_batch = 50
+        self.max_batch = 500
+        self._batch_successes = 0
+        self.client: Optional[httpx.AsyncClient] = None
+        # 限制同时在途的请求数，避免并发遍历时触发服务端限流（429）
+        # 退避等待期间不释放名额，限流时整体并发随之收缩
+        self.max_concurrency = max_concurrency
+        self._sem = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        # 复用同一个 HTTP/2 客户端，并发请求在同一条 TLS 连接上多路复用
+        self.client = httpx.AsyncClient(
+            http2=True,
+            headers=self.headers,
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+            timeout=30.0
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.client.aclose()
+
+    async def make_request(self, method, url, headers=None, json=None, max_retries=2):
+        """发送请求，headers 只需传入需要覆盖的请求头，会与客户端的公共请求头合并
+
+        429、5xx 以及连接失败、超时会退避后重试，其余错误或重试耗尽时抛出异常。
+        """
+        async with self._sem:
+            for attempt in range(max_retries):
+                last_attempt = attempt == max_retries - 1
+                await self._bucket.acquire()
+                try:
+                    # 请求体用 orjson 直接编码为 bytes，Content-Type 已在客户端公共请求头中
+                    response = await self.client.request(method, url, headers=headers, content=orjson.dumps(json))
+                except httpx.TransportError as e:
                     logger.error(f"请求失败：{e}")
-                    if attempt == max_retries - 1:
+                    if last_attempt:
                         raise
-
-    def get_share_info(self, share_id: str) -> Dict:
+                    await asyncio.sleep(self._backoff_delay(attempt))
+                    continue
+
+                status_code = response.status_code
+                if status_code == 429:
+                    self._bucket.slow_down()
+                    if not last_attempt:
+                        delay = self._backoff_delay(attempt, response.headers.get("Retry-After"))
+                        logger.warning(f"请求频率过高，{delay:.1f}秒后重试。尝试次数：{attempt + 1}")
+                        await asyncio.sleep(delay)
+                        continue
+                elif 500 <= status_code < 600 and not last_attempt:
+                    delay = self._backoff_delay(attempt)
+                    logger.warning(f"服务端错误 {status_code}，{delay:.1f}秒后重试。尝试次数：{attempt + 1}")
+                    await asyncio.sleep(delay)
+                    continue
+
+                try:
+                    response.raise_for_status()
+                except httpx.HTTPStatusError as e:
+                    logger.error(f"请求失败：{e}")
+                    raise
+                self._bucket.speed_up()
+                return orjson.loads(response.content)
+
+    @staticmethod
+    def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+        """计算重试前的等待时间：优先使用 Retry-After，否则为带抖动的指数退避（上限30秒）"""
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return min(30, 1.0 * (2 ** attempt)) * (1 + random.random() * 0.5)
+
+    async def get_share_info(self, share_id: str) -> Dict:
+        """获取分享信息，同一个 share_id 只请求一次"""
+        if share_id in self._share_cache:
+            return self._share_cache[share_id]
         url = f"{self.base_url}/adrive/v3/share_link/get_share_by_anonymous"
-        headers = self.headers.copy()
-        headers["X-Share-Token"] = self.share_token
         data = {"share_id": share_id}
-        response = self.make_request("POST", url, headers=headers, json=data)
+        response = await self.make_request("POST", url, headers=self.share_headers, json=data)
+        self._share_cache[share_id] = response
         return response
 
-    def list_files(self, share_id: str, parent_file_id: str, limit: int = 20) -> List[Dict]:
+    async def list_files(self, share_id: str, parent_file_id: str, limit: int = 100) -> List[Dict]:
+        """列出分享目录下的全部文件
+
+        next_marker 是服务端生成的不透明游标，无法预先算出后续页，只能顺序翻页，
+        因此使用接口允许的最大 limit 减少往返次数。
+        """
         url = f"{self.base_url}/adrive/v2/file/list_by_share"
-        headers = self.headers.copy()
-        headers["X-Share-Token"] = self.share_token
 
         all_files = []
         next_marker = None
@@ -70,7 +177,7 @@ class AliPCS:
             if next_marker:
                 data["marker"] = next_marker
 
-            response = self.make_request("POST", url, headers=headers, json=data)
+            response = await self.make_request("POST", url, headers=self.share_headers, json=data)
             all_files.extend(response.get('items', []))
 
             next_marker = response.get('next_marker')
@@ -79,7 +186,7 @@ class AliPCS:
 
         return all_files
 
-    def create_folder(self, parent_file_id: str, folder_name: str) -> Dict:
+    async def create_folder(self, parent_file_id: str, folder_name: str) -> Dict:
         url = f"{self.base_url}/adrive/v2/file/createWithFolders"
         data = {
             "drive_id": self.drive_id,
@@ -88,11 +195,50 @@ class AliPCS:
             "check_name_mode": "refuse",
             "type": "folder"
         }
-        response = self.make_request("POST", url, headers=self.headers, json=data)
-        print(response)
+        response = await self.make_request("POST", url, json=data)
+        logger.debug("createWithFolders response: %s", response)
         return response
 
-    def copy_file(self, share_id: str, file_id: str, to_parent_file_id: str) -> Dict:
+    async def batch_create_folders(self, parent_file_id: str, names: List[str]) -> List[Optional[str]]:
+        """批量创建文件夹，按 names 的顺序返回新文件夹的 file_id，创建失败的位置为 None
+
+        每次批量请求最多包含 max_batch 个子请求，子请求 id 为 names 中的全局下标。
+        """
+        url = f"{self.base_url}/adrive/v4/batch"
+
+        requests_data = [{
+            "body": {
+                "drive_id": self.drive_id,
+                "parent_file_id": parent_file_id,
+                "name": name,
+                "check_name_mode": "refuse",
+                "type": "folder"
+            },
+            "headers": BATCH_JSON_HEADERS,
+            "id": str(index),
+            "method": "POST",
+            "url": "/file/createWithFolders"
+        } for index, name in enumerate(names)]
+
+        slices = [requests_data[i:i + self.max_batch] for i in range(0, len(requests_data), self.max_batch)]
+        responses = await asyncio.gather(
+            *[self.make_request("POST", url, json={"requests": batch, "resource": "file"}) for batch in slices],
+            return_exceptions=True
+        )
+
+        file_ids: List[Optional[str]] = [None] * len(names)
+        for batch, response in zip(slices, responses):
+            if isinstance(response, Exception):
+                logger.error(f"批量创建文件夹时出错: {str(response)}，涉及文件夹: {', '.join(r['body']['name'] for r in batch)}")
+                continue
+            for result in response.get('responses', []):
+                if result['status'] in (200, 201):
+                    file_ids[int(result['id'])] = result['body'].get('file_id')
+                else:
+                    logger.error(f"创建文件夹失败: {result['body']}")
+        return file_ids
+
+    async def copy_file(self, share_id: str, file_id: str, to_parent_file_id: str) -> Dict:
         url = f"{self.base_url}/adrive/v4/batch"
         data = {
             "requests": [{
@@ -103,52 +249,115 @@ class AliPCS:
                     "to_parent_file_id": to_parent_file_id,
                     "to_drive_id": self.drive_id
                 },
-                "headers": {"Content-Type": "application/json"},
+                "headers": BATCH_JSON_HEADERS,
                 "id": "0",
                 "method": "POST",
                 "url": "/file/copy"
             }],
             "resource": "file"
         }
-        response = self.make_request("POST", url, headers=self.headers, json=data)
-        print("保存文件", response)
+        response = await self.make_request("POST", url, json=data)
         return response['responses'][0]['body']
 
-    def batch_copy_files(self, share_id: str, file_list: List[Dict], to_parent_file_id: str) -> Dict:
+    async def batch_copy_files(self, share_id: str, file_ids: List[str], to_parent_file_id: str) -> Dict:
         """批量复制文件（不包含文件夹）"""
         url = f"{self.base_url}/adrive/v4/batch"
-        headers = self.headers.copy()
-        headers["X-Share-Token"] = self.share_token
 
-        requests_data = []
-        for index, file in enumerate(file_list):
-            file_id = file["file_id"] if isinstance(file, dict) else file
-            requests_data.append({
-                "body": {
-                    "file_id": file_id,
-                    "share_id": share_id,
-                    "auto_rename": True,
-                    "to_parent_file_id": to_parent_file_id,
-                    "to_drive_id": self.drive_id
-                },
-                "headers": {"Content-Type": "application/json"},
-                "id": str(index),
-                "method": "POST",
-                "url": "/file/copy"
-            })
+        # 各子请求只有 file_id 不同，公共字段预先构造一次
+        body_base = {
+            "share_id": share_id,
+            "auto_rename": True,
+            "to_parent_file_id": to_parent_file_id,
+            "to_drive_id": self.drive_id
+        }
+        requests_data = [{
+            "body": {**body_base, "file_id": file_id},
+            "headers": BATCH_JSON_HEADERS,
+            "id": str(index),
+            "method": "POST",
+            "url": "/file/copy"
+        } for index, file_id in enumerate(file_ids)]
 
         data = {
             "requests": requests_data,
             "resource": "file"
         }
-        response = self.make_request("POST", url, headers=headers, json=data, max_retries=1)
+        response = await self.make_request("POST", url, headers=self.share_headers, json=data, max_retries=1)
         return response
 
-    def batch_copy_folder(self, share_id: str, folder_id: str, to_parent_file_id: str) -> Dict:
+    async def copy_files(self, share_id: str, file_ids: List[str], to_parent_file_id: str) -> List[Dict]:
+        """分批并发复制文件，批大小根据限流情况自适应调整，返回所有成功批次的子请求结果"""
+        results = []
+        remaining = list(file_ids)
+        attempt = 0
+        while remaining:
+            # 按当前批大小切分待复制的文件，各批并发提交，并发度由信号量和令牌桶控制
+            batches = [remaining[i:i + self.batch_size] for i in range(0, len(remaining), self.batch_size)]
+            batch_results = await asyncio.gather(
+                *[self._copy_batch(share_id, batch, to_parent_file_id, attempt) for batch in batches],
+                return_exceptions=True
+            )
+            attempt += 1
+
+            # 被限流的批次合并后按缩小的批大小重新切分提交，其他错误只记录该批次
+            throttled = []
+            for batch, result in zip(batches, batch_results):
+                if result is None:
+                    throttled.extend(batch)
+                elif isinstance(result, Exception):
+                    logger.error(f"批量复制文件时出错: {str(result)}，涉及文件: {', '.join(batch)}")
+                else:
+                    results.extend(result)
+            remaining = throttled
+            if remaining and not self._shrink_batch():
+                logger.error(f"批量复制文件被限流，跳过 {len(remaining)} 个文件: {', '.join(remaining)}")
+                break
+        return results
+
+    async def _copy_batch(self, share_id: str, file_ids: List[str], to_parent_file_id: str,
+                          attempt: int = 0) -> Optional[List[Dict]]:
+        """复制一批文件，返回子请求结果；被限流（429 或 MaxSaveFileCountExceed）时返回 None
+
+        遇到429时先按 Retry-After 或指数退避等待，再交给调用方缩小批大小后重新提交。
+        """
+        try:
+            response = await self.batch_copy_files(share_id, file_ids, to_parent_file_id)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                delay = self._backoff_delay(attempt, e.response.headers.get("Retry-After"))
+                logger.warning(f"批量复制文件被限流，{delay:.1f}秒后重试")
+                await asyncio.sleep(delay)
+                return None
+            raise
+
+        if response.get('code') == 'MaxSaveFileCountExceed':
+            logger.warning(f"批量复制文件失败: {response.get('message')} ({response.get('code')})")
+            return None
+
+        batch_results = response.get('responses', [])
+        logger.debug("copy batch: %d items", len(batch_results))
+        self._grow_batch()
+        return batch_results
+
+    def _shrink_batch(self) -> bool:
+        """被限流时批大小减半，已是最小批大小时返回 False"""
+        self._batch_successes = 0
+        if self.batch_size <= self.min_batch:
+            return False
+        self.batch_size = max(self.min_batch, self.batch_size // 2)
+        logger.warning(f"批量请求被限流，批大小调整为 {self.batch_size}")
+        return True
+
+    def _grow_batch(self):
+        """连续成功10次后把批大小放大到1.25倍"""
+        self._batch_successes += 1
+        if self._batch_successes >= 10:
+            self._batch_successes = 0
+            self.batch_size = min(self.max_batch, int(self.batch_size * 1.25))
+
+    async def batch_copy_folder(self, share_id: str, folder_id: str, to_parent_file_id: str) -> Dict:
         """批量复制文件夹"""
         url = f"{self.base_url}/adrive/v4/batch"
-        headers = self.headers.copy()
-        headers["X-Share-Token"] = self.share_token
 
         requests_data = [{
             "body": {
@@ -158,7 +367,7 @@ class AliPCS:
                 "to_parent_file_id": to_parent_file_id,
                 "to_drive_id": self.drive_id
             },
-            "headers": {"Content-Type": "application/json"},
+            "headers": BATCH_JSON_HEADERS,
             "id": "0",
             "method": "POST",
             "url": "/file/copy"
@@ -168,20 +377,18 @@ class AliPCS:
             "requests": requests_data,
             "resource": "file"
         }
-        response = self.make_request("POST", url, headers=headers, json=data,max_retries=1)
+        response = await self.make_request("POST", url, headers=self.share_headers, json=data,max_retries=1)
         return response
 
-    def check_async_task(self, task_id: str) -> Dict:
+    async def check_async_task(self, task_id: str) -> Dict:
         """检查异步任务状态"""
         url = f"{self.base_url}/adrive/v4/batch"
-        headers = self.headers.copy()
-        
         data = {
             "requests": [{
                 "body": {
                     "async_task_id": task_id
                 },
-                "headers": {"Content-Type": "application/json"},
+                "headers": BATCH_JSON_HEADERS,
                 "id": task_id,
                 "method": "POST",
                 "url": "/async_task/get"
@@ -189,35 +396,57 @@ class AliPCS:
             "resource": "file"
         }
         
-        response = self.make_request("POST", url, headers=headers, json=data, max_retries=1)
+        response = await self.make_request("POST", url, json=data, max_retries=1)
         return response
 
-def save_shared_folder(api: AliPCS, share_id: str, source_folder_id: str, target_folder_id: str):
-    """保存分享的文件夹"""
+    async def wait_task(self, task_id: str, timeout: float = 1800) -> str:
+        """等待异步任务结束，轮询间隔从1秒起逐步拉长（上限15秒）
+
+        返回任务的最终状态 'Succeed'、'Failed' 或 'Cancelled'；超过 timeout 秒仍未结束时返回 'Timeout'，
+        此时服务端任务可能仍在执行。单次查询失败只记录日志并继续等待。
+        """
+        delay = 1.0
+        deadline = time.monotonic() + timeout
+        while True:
+            logger.info(f"{task_id}查询是否成功转存整个目录...")
+            try:
+                task_result = await self.check_async_task(task_id)
+            except Exception as e:
+                logger.warning(f"{task_id}查询任务状态失败，稍后重试: {str(e)}")
+                task_result = {}
+
+            if task_result.get('responses'):
+                task_status = task_result['responses'][0]['body']
+                if task_status['state'] == 'Succeed':
+                    logger.info(f"成功转存整个目录，共处理 {task_status['total_process']} 个文件")
+                    return task_status['state']
+                elif task_status['state'] in ['Failed', 'Cancelled']:
+                    logger.error(f"转存失败: {task_status}")
+                    return task_status['state']
+            if time.monotonic() >= deadline:
+                logger.error(f"{task_id}等待转存任务超时（{timeout}秒）")
+                return 'Timeout'
+            await asyncio.sleep(delay + random.random() * 0.5)
+            delay = min(15, delay * 1.5)
+
+async def save_folder(api: AliPCS, share_id: str, source_folder_id: str, target_folder_id: str) -> List[tuple]:
+    """保存单个分享目录，返回仍需处理的子目录 (source_folder_id, target_folder_id) 列表"""
     # 首先尝试直接转存整个目录
     try:
         # 调用文件夹批量转存
-        result = api.batch_copy_folder(share_id, source_folder_id, target_folder_id)
+        result = await api.batch_copy_folder(share_id, source_folder_id, target_folder_id)
         
         # 检查返回结果
         if result.get('responses') and result['responses'][0]['status'] == 202:
-            # 获取异步任务ID
+            # 获取异步任务ID，等待任务结束；轮询期间其他 worker 继续处理别的目录
             task_id = result['responses'][0]['body']['async_task_id']
-            
-            # 轮询检查任务状态
-            while True:
-                logger.info(f"{task_id}查询是否成功转存整个目录...")
-                task_result = api.check_async_task(task_id)
-
-                if task_result.get('responses'):
-                    task_status = task_result['responses'][0]['body']
-                    if task_status['state'] == 'Succeed':
-                        logger.info(f"成功转存整个目录，共处理 {task_status['total_process']} 个文件")
-                        return True
-                    elif task_status['state'] in ['Failed', 'Cancelled']:
-                        logger.error(f"转存失败: {task_status}")
-                        break
-                time.sleep(1)  # 等待1秒后再次检查
+            state = await api.wait_task(task_id)
+            if state == 'Succeed':
+                return []
+            if state == 'Timeout':
+                # 服务端任务可能仍在执行，此时逐个转存会把目录重复复制一遍（auto_rename）
+                logger.error(f"{task_id}转存任务未在限定时间内结束，跳过逐个转存，请稍后检查目标目录")
+                return []
         
         # 处理错误情况
         elif result.get('code'):
@@ -230,47 +459,73 @@ def save_shared_folder(api: AliPCS, share_id: str, source_folder_id: str, target
 
     # 如果直接转存失败，执行原有的逐个转存逻辑
     logger.info("开始执行逐个转存...")
-    files = api.list_files(share_id, source_folder_id)
+    files = await api.list_files(share_id, source_folder_id)
     if not files:
         logger.info("目录为空或无法获取文件列表")
-        return True
-
-    file_list = []
-    folder_list = []
+        return []
 
     # 分离文件和文件夹
-    for file in files:
-        if file["type"] == "folder":
-            folder_list.append(file)
-        else:
-            file_list.append(file)
+    file_ids = [file["file_id"] for file in files if file["type"] != "folder"]
+    folder_list = [file for file in files if file["type"] == "folder"]
 
     # 批量处理文件
-    if file_list:
+    if file_ids:
         try:
-            # 每500个文件一批进行处理
-            batch_size = 500
-            for i in range(0, len(file_list), batch_size):
-                batch = file_list[i:i+batch_size]
-                results = api.batch_copy_files(share_id, batch, target_folder_id)
-                for result in results:
-                    if result['status'] == 201:
-                        logger.info(f"复制文件成功: {result['body']['file_id']}")
-                    else:
-                        logger.error(f"复制文件失败: {result['body']}")
-                time.sleep(api.request_interval)  # 添加延迟避免频率限制
+            for result in await api.copy_files(share_id, file_ids, target_folder_id):
+                if result['status'] == 201:
+                    logger.info(f"复制文件成功: {result['body']['file_id']}")
+                else:
+                    logger.error(f"复制文件失败: {result['body']}")
         except Exception as e:
             logger.error(f"批量复制文件时出错: {str(e)}")
 
-    # 处理文件夹
-    for folder in folder_list:
-        try:
-            new_folder = api.create_folder(target_folder_id, folder["name"])
-            logger.info(f"创建文件夹: {folder['name']} -> {new_folder['file_id']}")
-            save_shared_folder(api, share_id, folder["file_id"], new_folder["file_id"])
-        except Exception as e:
-            logger.error(f"处理文件夹 {folder['name']} 时出错: {str(e)}")
-        time.sleep(api.request_interval)
+    # 处理文件夹：批量请求创建全部子文件夹，子目录交给工作队列继续处理
+    if not folder_list:
+        return []
+    try:
+        new_folder_ids = await api.batch_create_folders(target_folder_id, [folder["name"] for folder in folder_list])
+    except Exception as e:
+        logger.error(f"批量创建文件夹时出错: {str(e)}")
+        return []
+
+    subfolders = []
+    for folder, new_folder_id in zip(folder_list, new_folder_ids):
+        if new_folder_id is None:
+            logger.error(f"处理文件夹 {folder['name']} 时出错: 创建文件夹失败")
+            continue
+        logger.info(f"创建文件夹: {folder['name']} -> {new_folder_id}")
+        subfolders.append((folder["file_id"], new_folder_id))
+
+    return subfolders
+
+async def save_shared_folder(api: AliPCS, share_id: str, source_folder_id: str, target_folder_id: str,
+                             workers: Optional[int] = None):
+    """保存分享的文件夹
+
+    用工作队列代替递归遍历目录树，多个 worker 并发处理互不相关的子树，
+    目录再深也不会超出递归深度限制。
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    queue.put_nowait((source_folder_id, target_folder_id))
+
+    async def worker():
+        while True:
+            source_id, target_id = await queue.get()
+            try:
+                for subfolder in await save_folder(api, share_id, source_id, target_id):
+                    queue.put_nowait(subfolder)
+            except Exception as e:
+                logger.error(f"处理文件夹 {source_id} 时出错: {str(e)}")
+            finally:
+                queue.task_done()
+
+    tasks = [asyncio.create_task(worker()) for _ in range(workers or api.max_concurrency)]
+    try:
+        await queue.join()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     return True
 
@@ -280,7 +535,7 @@ def extract_ids_from_link(share_link):
     folder_id = parts[-1] if len(parts) > 5 else None  # 提取 folder_id（如果存在）
     return share_id, folder_id
 
-def main():
+async def main():
     share_link = "https://www.aliyundrive.com/s/hocV43RFQay"
     # share_link = "https://www.aliyundrive.com/s/hocV43RFQay/folder/61517c215fa6150d644e4a2b8fd2122ea876ac46"
     share_token = "请填写"
@@ -288,31 +543,31 @@ def main():
     drive_id = "请填写"
 
     try:
-        api = AliPCS(access_token, share_token, drive_id)
-        # 提取 share_id 和 folder_id
-        share_id, folder_id = extract_ids_from_link(share_link)
+        async with AliPCS(access_token, share_token, drive_id) as api:
+            # 提取 share_id 和 folder_id
+            share_id, folder_id = extract_ids_from_link(share_link)
 
-        # 获取分享信息
-        share_info = api.get_share_info(share_id)
-        if folder_id:
-            root_folder_id = folder_id
-        else:
-            root_folder_id = share_info['file_infos'][0]['file_id']
-        logger.info(f"分享名称: {share_info['share_name']}")
-        logger.info(f"文件数量: {share_info['file_count']}")
+            # 获取分享信息
+            share_info = await api.get_share_info(share_id)
+            if folder_id:
+                root_folder_id = folder_id
+            else:
+                root_folder_id = share_info['file_infos'][0]['file_id']
+            logger.info(f"分享名称: {share_info['share_name']}")
+            logger.info(f"文件数量: {share_info['file_count']}")
 
-        # 创建目标文件夹
-        target_folder_name = share_info['share_name']
-        target_folder = api.create_folder("root", target_folder_name)
-        target_folder_id = target_folder["file_id"]
+            # 创建目标文件夹
+            target_folder_name = share_info['share_name']
+            target_folder = await api.create_folder("root", target_folder_name)
+            target_folder_id = target_folder["file_id"]
 
-        # 开始保存分享的文件夹结构
-        save_shared_folder(api, share_id, root_folder_id, target_folder_id)
+            # 开始保存分享的文件夹结构
+            await save_shared_folder(api, share_id, root_folder_id, target_folder_id)
 
-        logger.info("所有文件和文件夹已成功转存。")
+            logger.info("所有文件和文件夹已成功转存。")
 
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())